@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark of hash_passwords / validate_many throughput versus worker count.
+
+Usage:
+    ./bench_encrypt_password.py [--count N] [--workers 1 2 4] [--processes]
+"""
+
+import argparse
+import os
+import time
+from typing import List
+from encrypt_password import calibrate_rounds, hash_passwords, validate_many
+
+
+def measure(count: int, workers: int, processes: bool) -> dict:
+    """
+    Hashes then validates `count` passwords with the given worker setup.
+
+    Args:
+    count (int): Number of passwords.
+    workers (int): Number of workers.
+    processes (bool): Use a process pool instead of a thread pool.
+
+    Returns:
+    dict: Throughput of both operations, in passwords per second.
+    """
+    passwords = [f"password-{i}" for i in range(count)]
+    # Calibrate before timing so the first run measures hashing only
+    calibrate_rounds()
+
+    started = time.perf_counter()
+    hashed = list(hash_passwords(passwords, workers, processes))
+    hash_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    valid = list(validate_many(zip(hashed, passwords), workers, processes))
+    validate_time = time.perf_counter() - started
+    assert all(valid)
+
+    return {"workers": workers,
+            "hash_per_sec": count / hash_time,
+            "validate_per_sec": count / validate_time}
+
+
+def main(argv: List[str] = None):
+    """ Run the benchmark for each worker count and print a table. """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=32,
+                        help="passwords per run (default: 32)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="worker counts to compare")
+    parser.add_argument("--processes", action="store_true",
+                        help="use a process pool instead of threads")
+    args = parser.parse_args(argv)
+
+    print(f"{'workers':>8} {'hash/s':>10} {'validate/s':>12} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        result = measure(args.count, workers, args.processes)
+        baseline = baseline or result["hash_per_sec"]
+        print(f"{workers:>8} {result['hash_per_sec']:>10.1f} "
+              f"{result['validate_per_sec']:>12.1f} "
+              f"{result['hash_per_sec'] / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
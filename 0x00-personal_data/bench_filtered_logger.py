@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the redaction paths of filtered_logger.
+
+Synthetic records shaped like user_data.csv are generated for several
+scenarios, and each redaction path reports ops/sec, ns/byte and the peak
+memory traced while processing the records.
+
+Usage:
+    ./bench_filtered_logger.py [--records N] [--json out.json]
+                               [--compare previous.json]
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+from filtered_logger import (PII_FIELDS, USER_FIELDS, RedactingFormatter,
+                             filter_datum)
+
+SEPARATOR = RedactingFormatter.SEPARATOR
+REDACTION = RedactingFormatter.REDACTION
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/74.0.3729.157 Safari/537.36")
+
+
+def _user_row(rng: random.Random) -> Dict[str, str]:
+    """
+    Generates one random row with the columns of user_data.csv.
+    """
+    n = rng.randrange(10 ** 6)
+    return {"name": f"User {n}",
+            "email": f"user{n}@example.com",
+            "phone": f"({n % 1000:03d}) 555-{n % 10000:04d}",
+            "ssn": f"{n % 1000:03d}-{n % 100:02d}-{n % 10000:04d}",
+            "password": f"pw{n:x}&?",
+            "ip": f"10.{n % 256}.{n // 256 % 256}.{n // 65536 % 256}",
+            "last_login": "2019-11-14T06:14:24",
+            "user_agent": USER_AGENT}
+
+
+def generate(scenario: str, count: int, seed: int = 0) -> List[dict]:
+    """
+    Generates the structured data of `count` records for a scenario.
+
+    Scenarios:
+        short       -- name, email and ip only
+        long_ua     -- full row with a user agent about 1 KiB long
+        many_fields -- full row plus 40 extra non-PII fields
+        no_pii      -- ip, last_login and user_agent only
+
+    Args:
+        scenario (str): One of SCENARIOS.
+        count (int): Number of records.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[dict]: One field -> value mapping per record.
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        row = _user_row(rng)
+        if scenario == "short":
+            row = {key: row[key] for key in ("name", "email", "ip")}
+        elif scenario == "long_ua":
+            row["user_agent"] = " ".join([USER_AGENT] * 8)
+        elif scenario == "many_fields":
+            row.update((f"attr_{i}", f"value-{i}") for i in range(40))
+        elif scenario == "no_pii":
+            row = {key: row[key] for key in USER_FIELDS
+                   if key not in PII_FIELDS}
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        records.append(row)
+    return records
+
+
+SCENARIOS = ("short", "long_ua", "many_fields", "no_pii")
+
+
+def to_message(data: dict) -> str:
+    """
+    Serializes structured data as the key=value line main() used to log.
+    """
+    return " ".join(f"{key}={value}{SEPARATOR}" for key, value in data.items())
+
+
+def _record(msg: str, data: dict = None) -> logging.LogRecord:
+    """
+    Builds a log record as the user_data logger would.
+    """
+    record = logging.LogRecord("user_data", logging.INFO, __file__, 0, msg,
+                               None, None)
+    if data is not None:
+        record.data = data
+    return record
+
+
+def build_paths(records: List[dict]) -> Dict[str, Callable[[], None]]:
+    """
+    Prepares one callable per redaction path, each processing every record.
+
+    Args:
+        records (List[dict]): Structured data of the records.
+
+    Returns:
+        Dict[str, Callable[[], None]]: Path name -> benchmark body.
+    """
+    fields = list(PII_FIELDS)
+    messages = [to_message(data) for data in records]
+    text_records = [_record(message) for message in messages]
+    data_records = [_record("", data) for data in records]
+    formatter = RedactingFormatter(fields)
+    json_formatter = RedactingFormatter(fields, structured_format="json")
+
+    def run_filter_datum():
+        for message in messages:
+            filter_datum(fields, REDACTION, message, SEPARATOR)
+
+    def run_redactor():
+        redactor = formatter.redactor
+        for message in messages:
+            redactor(message)
+
+    def run_formatter():
+        for record in text_records:
+            formatter.format(record)
+
+    def run_structured_kv():
+        for record in data_records:
+            formatter.format(record)
+
+    def run_structured_json():
+        for record in data_records:
+            json_formatter.format(record)
+
+    return {"filter_datum": run_filter_datum,
+            "redactor": run_redactor,
+            "formatter": run_formatter,
+            "structured_kv": run_structured_kv,
+            "structured_json": run_structured_json}
+
+
+def measure(body: Callable[[], None], count: int, size: int,
+            repeat: int) -> Dict[str, float]:
+    """
+    Times a benchmark body and traces its peak memory.
+
+    Args:
+        body (Callable[[], None]): Processes `count` records per call.
+        count (int): Number of records processed per call.
+        size (int): Total bytes of the key=value messages.
+        repeat (int): Timed calls; the fastest one is reported.
+
+    Returns:
+        Dict[str, float]: ops_per_sec, ns_per_byte and peak_kib.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    body()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": round(count / best, 1),
+            "ns_per_byte": round(best * 1e9 / size, 3),
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def run(count: int, repeat: int, seed: int = 0) -> dict:
+    """
+    Runs every redaction path on every scenario.
+
+    Args:
+        count (int): Records per scenario.
+        repeat (int): Timed runs per measurement.
+        seed (int): Seed of the record generator.
+
+    Returns:
+        dict: Machine-readable results keyed by "scenario/path".
+    """
+    results = {}
+    for scenario in SCENARIOS:
+        records = generate(scenario, count, seed)
+        size = sum(len(to_message(data).encode()) for data in records)
+        for path, body in build_paths(records).items():
+            results[f"{scenario}/{path}"] = measure(body, count, size,
+                                                    repeat)
+    return {"python": platform.python_version(),
+            "records": count,
+            "repeat": repeat,
+            "results": results}
+
+
+def main(argv: List[str] = None):
+    """ Run the suite, print a table and optionally save or compare. """
+    parser = argparse.ArgumentParser(
+        description="Benchmark filtered_logger redaction paths.")
+    parser.add_argument("--records", type=int, default=10000,
+                        help="records per scenario (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per measurement (default: 5)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.records, args.repeat)
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    out = sys.stderr if args.json == "-" else sys.stdout
+    out.write(f"{'scenario/path':<30} {'ops/sec':>12} {'ns/byte':>9} "
+              f"{'peak KiB':>9}{'  vs prev' if previous else ''}\n")
+    for name, result in report["results"].items():
+        line = (f"{name:<30} {result['ops_per_sec']:>12,.0f} "
+                f"{result['ns_per_byte']:>9.2f} {result['peak_kib']:>9.1f}")
+        if name in previous:
+            ratio = result["ops_per_sec"] / previous[name]["ops_per_sec"]
+            line += f"  {ratio:>6.2f}x"
+        out.write(line + "\n")
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,116 @@
 This module provides functionality to hash passwords securely.
 """
 
+import os
+import threading
+import time
 import bcrypt
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, Iterable, Iterator, Tuple, Union
 
+# Hashing time budget used to pick the bcrypt cost factor, in milliseconds
+TARGET_HASH_MS = 250
 
-def hash_password(password: str) -> bytes:
+# Cost factor bounds; calibration never goes below MIN_ROUNDS
+MIN_ROUNDS = 10
+MAX_ROUNDS = 31
+
+# Serializes calibration: concurrent sweeps would slow each other down
+_calibration_lock = threading.Lock()
+
+
+def calibrate_rounds(target_ms: float = TARGET_HASH_MS) -> int:
+    """
+    Picks the largest bcrypt cost factor whose hash time on this machine
+    fits in the target budget. The result is cached for the process, and
+    the BCRYPT_ROUNDS environment variable pins it without measuring.
+    Calibration runs once even when several threads ask at the same time.
+
+    Args:
+    target_ms (float): Time budget for hashing one password.
+
+    Returns:
+    int: The cost factor to pass to bcrypt.gensalt().
+    """
+    with _calibration_lock:
+        return _calibrate(target_ms)
+
+
+@lru_cache(maxsize=None)
+def _calibrate(target_ms: float) -> int:
+    """
+    Measures the cost factor for calibrate_rounds.
+    """
+    pinned = os.environ.get("BCRYPT_ROUNDS")
+    if pinned:
+        return min(max(int(pinned), 4), MAX_ROUNDS)
+
+    rounds = MIN_ROUNDS
+    elapsed = _hash_time_ms(rounds)
+    # Each extra round doubles the work
+    while rounds < MAX_ROUNDS and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed = _hash_time_ms(rounds)
+    if elapsed > target_ms and rounds > MIN_ROUNDS:
+        rounds -= 1
+    return rounds
+
+
+def _hash_time_ms(rounds: int) -> float:
+    """
+    Measures the time, in milliseconds, of one bcrypt hash at a cost.
+    """
+    salt = bcrypt.gensalt(rounds=rounds)
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", salt)
+    return (time.perf_counter() - started) * 1000
+
+
+def hash_rounds(hashed_password: Union[bytes, str]) -> int:
+    """
+    Reads the cost factor of a bcrypt hash.
+
+    Args:
+    hashed_password (bytes): A hash such as b"$2b$12$...".
+
+    Returns:
+    int: The cost factor the hash was made with.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode()
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: Union[bytes, str]) -> bool:
+    """
+    Tells whether a hash uses a lower cost than the calibrated one and
+    should be replaced after the next successful login.
+
+    Args:
+    hashed_password (bytes): The stored bcrypt hash.
+
+    Returns:
+    bool: True if the hash should be upgraded.
+    """
+    return hash_rounds(hashed_password) < calibrate_rounds()
+
+
+def hash_password(password: str, rounds: int = None) -> bytes:
     """
     Hashes a password with bcrypt.
 
     Args:
     password (str): The plaintext password to hash.
+    rounds (int): Cost factor; defaults to the calibrated one.
 
     Returns:
     bytes: The hashed password.
     """
-    salt = bcrypt.gensalt()
+    if rounds is None:
+        rounds = calibrate_rounds()
+    salt = bcrypt.gensalt(rounds=rounds)
     return bcrypt.hashpw(password.encode(), salt)
 
 
@@ -32,3 +128,74 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     bool: True if the password is correct, False otherwise.
     """
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+def _validate_pair(pair: Tuple[bytes, str]) -> bool:
+    """
+    Unpacks a (hashed_password, password) pair for is_valid.
+    """
+    return is_valid(*pair)
+
+
+def _ordered_map(func: Callable, items: Iterable, workers: int = None,
+                 processes: bool = False) -> Iterator:
+    """
+    Applies func to items on a pool of workers, yielding results in input
+    order while keeping at most twice as many tasks in flight as workers.
+
+    Args:
+    func (Callable): Function to apply; must be picklable for processes.
+    items (Iterable): Inputs, consumed lazily.
+    workers (int): Number of workers; defaults to the CPU count.
+    processes (bool): Use a process pool instead of a thread pool.
+
+    Returns:
+    Iterator: The results, in the same order as items.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def hash_passwords(passwords: Iterable[str], workers: int = None,
+                   processes: bool = False) -> Iterator[bytes]:
+    """
+    Hashes many passwords in parallel. bcrypt releases the GIL while
+    hashing, so the default thread pool uses every core. The cost factor is
+    calibrated once, here, before any worker starts hashing, so every
+    password of the batch uses the same cost and child processes do not
+    calibrate again.
+
+    Args:
+    passwords (Iterable[str]): The plaintext passwords to hash.
+    workers (int): Number of workers; defaults to the CPU count.
+    processes (bool): Use a process pool instead of a thread pool.
+
+    Returns:
+    Iterator[bytes]: The hashed passwords, in input order.
+    """
+    hash_func = partial(hash_password, rounds=calibrate_rounds())
+    return _ordered_map(hash_func, passwords, workers, processes)
+
+
+def validate_many(pairs: Iterable[Tuple[bytes, str]], workers: int = None,
+                  processes: bool = False) -> Iterator[bool]:
+    """
+    Validates many (hashed_password, password) pairs in parallel.
+
+    Args:
+    pairs (Iterable[Tuple[bytes, str]]): Hashed and plaintext passwords.
+    workers (int): Number of workers; defaults to the CPU count.
+    processes (bool): Use a process pool instead of a thread pool.
+
+    Returns:
+    Iterator[bool]: Whether each password matches, in input order.
+    """
+    return _ordered_map(_validate_pair, pairs, workers, processes)
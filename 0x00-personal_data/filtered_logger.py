@@ -4,17 +4,119 @@ This module provides functionality to obfuscate specified fields in log
 messages.
 """
 
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import re
+import sys
+import threading
+import time
 import mysql.connector
+from contextlib import contextmanager
+from functools import lru_cache
 from os import environ
 from datetime import datetime
-from typing import List
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Sequence,
+                    Tuple)
 
 # Define PII fields
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
+# Columns exported from the users table, in query order
+USER_FIELDS = ("name", "email", "phone", "ssn", "password", "ip",
+               "last_login", "user_agent")
+
+# Number of rows pulled from the server per round trip in main()
+DEFAULT_BATCH_SIZE = 1000
+
+# Maximum number of records waiting for the background logging thread
+DEFAULT_QUEUE_SIZE = 10000
+
+# Query used to export the users table
+USERS_QUERY = """
+    SELECT name, email, phone, ssn, password, ip, last_login, user_agent
+    FROM users
+"""
+
+
+class Redactor:
+    """
+    Redacts a fixed set of fields from log messages in a single pass.
+
+    The field names are compiled once into one alternation pattern, so each
+    message is scanned only once no matter how many fields are redacted.
+    Before that, a cheap substring prefilter looks for the `field=` tokens:
+    messages containing none of them are returned untouched, and otherwise
+    the pattern only runs from the first token found. `hits` and `misses`
+    count how often the rewrite ran or was skipped.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Compile the redaction pattern for the given fields.
+
+        Args:
+            fields (Tuple[str, ...]): Names of the fields to obfuscate.
+            redaction (str): Replacement value for the fields.
+            separator (str): Character that separates fields in messages.
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        alternation = "|".join(re.escape(field) for field in self.fields)
+        sep = re.escape(separator)
+        self._pattern = re.compile(f"({alternation})=.*?{sep}")
+        self._replacement = "\\g<1>={}{}".format(
+            redaction.replace("\\", "\\\\"),
+            separator.replace("\\", "\\\\"))
+        self._tokens = tuple(f"{field}=" for field in self.fields)
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, message: str) -> str:
+        """
+        Obfuscates the configured fields in a message.
+
+        Args:
+            message (str): Log message to process.
+
+        Returns:
+            str: The message with every configured field obfuscated.
+        """
+        start = -1
+        for token in self._tokens:
+            index = message.find(token)
+            if index != -1 and (start == -1 or index < start):
+                start = index
+        if start == -1:
+            self.misses += 1
+            return message
+        self.hits += 1
+        return message[:start] + self._pattern.sub(self._replacement,
+                                                   message[start:])
+
+
+@lru_cache(maxsize=128)
+def get_redactor(fields: Tuple[str, ...], separator: str,
+                 redaction: str) -> Redactor:
+    """
+    Returns a compiled Redactor, reusing one already built for the same
+    fields, separator and redaction.
+
+    Args:
+        fields (Tuple[str, ...]): Names of the fields to obfuscate.
+        separator (str): Character that separates fields in messages.
+        redaction (str): Replacement value for the fields.
+
+    Returns:
+        Redactor: A redactor for the given configuration.
+    """
+    return Redactor(fields, redaction, separator)
+
 
 def filter_datum(fields: List[str], redaction: str, message: str,
                  separator: str) -> str:
@@ -30,17 +132,103 @@ def filter_datum(fields: List[str], redaction: str, message: str,
     Returns:
     A log message with specified fields obfuscated.
     """
-    for field in fields:
-        message = re.sub(f"{field}=.*?{separator}",
-                         f"{field}={redaction}{separator}", message)
-    return message
+    return get_redactor(tuple(fields), separator, redaction)(message)
 
 
-def get_logger() -> logging.Logger:
+class BoundedQueueListener(logging.handlers.QueueListener):
+    """
+    Queue listener that waits for room to enqueue its stop sentinel, so it
+    can be stopped while a bounded queue is full.
+    """
+
+    def enqueue_sentinel(self):
+        """
+        Blocks until the stop sentinel is on the queue.
+        """
+        self.queue.put(self._sentinel)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands records to a background listener thread, with a
+    policy for what to do when the bounded queue is full.
+
+    Overflow policies:
+        block -- wait until the listener frees a slot
+        drop  -- discard the record silently
+        count -- discard the record and tally it in `dropped`, reported to
+                 stderr when the handler is closed
+    """
+    OVERFLOW_POLICIES = ("block", "drop", "count")
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "block"):
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue (queue.Queue): Bounded queue shared with the listener.
+            overflow (str): One of OVERFLOW_POLICIES.
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Puts a record on the queue according to the overflow policy.
+
+        Args:
+            record (logging.LogRecord): The prepared record.
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "count":
+                self.dropped += 1
+
+    def close(self):
+        """
+        Stops the listener after it has written every queued record.
+        """
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.flush()
+        if self.dropped:
+            sys.stderr.write(f"user_data logger dropped {self.dropped} "
+                             f"records on a full queue\n")
+            self.dropped = 0
+        super().close()
+
+
+def get_logger(asynchronous: bool = False,
+               queue_size: int = DEFAULT_QUEUE_SIZE,
+               overflow: str = "block",
+               structured_format: str = "kv") -> logging.Logger:
     """
     Configures and returns a logger with specified settings to handle user
     data.
 
+    In asynchronous mode the calling thread only enqueues the record; a
+    background listener thread runs the RedactingFormatter and writes to the
+    stream. Queued records are flushed when the handler is closed, which
+    logging.shutdown() does at interpreter exit.
+
+    Args:
+        asynchronous (bool): Install a queue handler and listener thread
+                             instead of writing on the calling thread.
+        queue_size (int): Capacity of the queue in asynchronous mode.
+        overflow (str): Full-queue policy: "block", "drop" or "count".
+        structured_format (str): How records logged with extra={"data": ...}
+                                 are serialized, "kv" or "json".
+
     Returns:
         logging.Logger: Configured logger with redaction formatting.
     """
@@ -50,13 +238,37 @@ def get_logger() -> logging.Logger:
 
     # Create a stream handler with specific formatting
     stream_handler = logging.StreamHandler()
-    formatter = RedactingFormatter(fields=list(PII_FIELDS))
+    formatter = RedactingFormatter(fields=list(PII_FIELDS),
+                                   structured_format=structured_format)
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+
+    if not asynchronous:
+        logger.addHandler(stream_handler)
+        return logger
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, overflow)
+    queue_handler.listener = BoundedQueueListener(
+        log_queue, stream_handler, respect_handler_level=True)
+    queue_handler.listener.start()
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+def shutdown_logger(logger: logging.Logger):
+    """
+    Flushes and detaches the asynchronous handlers of a logger.
+
+    Args:
+        logger (logging.Logger): Logger returned by get_logger().
+    """
+    for handler in list(logger.handlers):
+        if isinstance(handler, BoundedQueueHandler):
+            logger.removeHandler(handler)
+            handler.close()
+
+
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """
     Connects to the MySQL database using environment variables and returns
@@ -78,27 +290,264 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return connection
 
 
-def main():
-    """ Log user data from a database, obfuscating sensitive fields. """
+class ConnectionPool:
+    """
+    Fixed-size pool of reusable DB-API connections.
+
+    Connections are opened lazily through `connect`, up to `size` of them,
+    and handed back out after release instead of being closed. Any factory
+    returning an object with the DB-API connection surface works, which lets
+    the pool run against a sqlite-backed stand-in as well as MySQL.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5,
+                 timeout: float = 30.0):
+        """
+        Initialize the pool.
+
+        Args:
+            connect (Callable): Factory opening a new connection.
+            size (int): Maximum number of open connections.
+            timeout (float): Seconds acquire() waits for a free connection.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._idle = []
+        self._opened = 0
+        self._closed = False
+        self._available = threading.Condition()
+
+    def acquire(self, timeout: float = None):
+        """
+        Returns an idle connection, opening a new one if the pool is not
+        full yet, or waiting for one to be released otherwise.
+
+        Args:
+            timeout (float): Seconds to wait; defaults to the pool timeout.
+
+        Returns:
+            A DB-API connection.
+
+        Raises:
+            TimeoutError: If no connection became free in time.
+            RuntimeError: If the pool is closed.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._opened < self.size:
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No connection available after {timeout}s")
+                self._available.wait(remaining)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def release(self, connection):
+        """
+        Returns a connection to the pool. Connections that report they are
+        no longer connected are closed and their slot is freed, as are
+        connections released after the pool was closed.
+
+        Any result left unread is drained and the open transaction rolled
+        back, so the next borrower neither trips on "Unread result found"
+        nor keeps reading this borrower's REPEATABLE READ snapshot. A
+        connection that cannot be reset is discarded.
+
+        Args:
+            connection: A connection obtained from acquire().
+        """
+        is_connected = getattr(connection, "is_connected", None)
+        if is_connected is not None and not is_connected():
+            self._discard(connection)
+            return
+        try:
+            consume_results = getattr(connection, "consume_results", None)
+            if consume_results is not None:
+                consume_results()
+            connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        with self._available:
+            if not self._closed:
+                self._idle.append(connection)
+                self._available.notify()
+                return
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """
+        Context manager borrowing a connection for the duration of a block.
+
+        Args:
+            timeout (float): Seconds to wait; defaults to the pool timeout.
+
+        Yields:
+            A DB-API connection.
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """
+        Closes every idle connection held by the pool. Connections still
+        borrowed are closed when they are released, and acquire() fails
+        from now on.
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for connection in idle:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        """
+        Closes a connection and frees its slot in the pool, waking up a
+        caller waiting in acquire() to open a new one.
+        """
+        with self._available:
+            self._opened -= 1
+            self._available.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool of connections opened by get_db().
+
+    The pool is sized by PERSONAL_DATA_DB_POOL_SIZE (default 5) and waits
+    at most PERSONAL_DATA_DB_POOL_TIMEOUT seconds (default 30) for a free
+    connection.
+
+    Returns:
+        ConnectionPool: The shared connection pool.
+    """
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            size = int(environ.get("PERSONAL_DATA_DB_POOL_SIZE", 5))
+            timeout = float(environ.get("PERSONAL_DATA_DB_POOL_TIMEOUT", 30))
+            _db_pool = ConnectionPool(get_db, size, timeout)
+        return _db_pool
+
+
+def get_cursor(connection, prepared: bool = False):
+    """
+    Opens a cursor, server-side prepared when requested and supported.
+
+    mysql.connector prepares the statement once per cursor and only sends
+    parameters on later executions; drivers without prepared cursors fall
+    back to a plain cursor.
+
+    Args:
+        connection: A DB-API connection.
+        prepared (bool): Request a prepared-statement cursor.
+
+    Returns:
+        A DB-API cursor.
+    """
+    if prepared:
+        try:
+            return connection.cursor(prepared=True)
+        except TypeError:
+            pass
+    return connection.cursor()
+
+
+def fetch_batches(cursor, batch_size: int) -> Iterator[Sequence[tuple]]:
+    """
+    Yields rows from an executed cursor in batches of at most batch_size.
+
+    Args:
+        cursor: DB-API cursor on which a query has been executed.
+        batch_size (int): Maximum number of rows to fetch per round trip.
+
+    Yields:
+        Sequence[tuple]: The next non-empty batch of rows.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def format_rows(batches: Iterable[Sequence[tuple]]
+                ) -> Iterator[Dict[str, Any]]:
+    """
+    Turns batches of users rows into structured log data.
+
+    Args:
+        batches (Iterable[Sequence[tuple]]): Batches of rows whose columns
+                                             follow USER_FIELDS.
+
+    Yields:
+        Dict[str, Any]: One field -> value mapping per row, to be passed to
+                        the logger as extra={"data": ...}.
+    """
+    for rows in batches:
+        for row in rows:
+            data = dict(zip(USER_FIELDS, row))
+            last_login = data["last_login"]
+            if isinstance(last_login, datetime):
+                data["last_login"] = datetime.strftime(last_login,
+                                                       "%Y-%m-%dT%H:%M:%S")
+            yield data
+
+
+def main(batch_size: int = None):
+    """
+    Log user data from a database, obfuscating sensitive fields.
+
+    Rows are streamed from an unbuffered cursor in batches so memory stays
+    bounded by batch_size rather than by the size of the users table.
+
+    Args:
+        batch_size (int): Rows fetched per round trip; defaults to the
+                          PERSONAL_DATA_BATCH_SIZE environment variable.
+    """
+    if batch_size is None:
+        batch_size = int(environ.get("PERSONAL_DATA_BATCH_SIZE",
+                                     DEFAULT_BATCH_SIZE))
     logger = get_logger()
     connection = get_db()
-    cursor = connection.cursor()
-    query = """
-        SELECT name, email, phone, ssn, password, ip, last_login, user_agent
-        FROM users
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
-
-    for result in results:
-        ip = result[5]
-        last_login_str = datetime.strftime(result[6], "%Y-%m-%dT%H:%M:%S")
-        user_agent = result[7]
-        log_message = (
-            f"name=***; email=***; phone=***; ssn=***; password=***; "
-            f"ip={ip}; last_login={last_login_str}; user_agent={user_agent};"
-        )
-        logger.info(log_message)
+    cursor = connection.cursor(buffered=False)
+    cursor.execute(USERS_QUERY)
+
+    # fetch -> format -> redact (in the logger's formatter) -> emit
+    for data in format_rows(fetch_batches(cursor, batch_size)):
+        logger.info("", extra={"data": data})
 
     cursor.close()
     connection.close()
@@ -107,20 +556,34 @@ def main():
 class RedactingFormatter(logging.Formatter):
     """
     Redacting Formatter class that filters specified fields in log messages.
+
+    Records logged with extra={"data": {...}} take a structured path: the
+    fields are redacted by key, without any pattern matching, and serialized
+    once either as key=value pairs after the message or as a JSON line.
     """
     REDACTION = "***"
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
+    STRUCTURED_FORMATS = ("kv", "json")
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], structured_format: str = "kv"):
         """
         Initialize the RedactingFormatter.
 
         Args:
             fields (List[str]): List of fields to redact.
+            structured_format (str): Serialization of structured records,
+                                     "kv" or "json".
         """
+        if structured_format not in self.STRUCTURED_FORMATS:
+            raise ValueError(
+                f"Unknown structured format: {structured_format}")
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.structured_format = structured_format
+        self.redactor = Redactor(tuple(fields), self.REDACTION,
+                                 self.SEPARATOR)
+        self._field_set = frozenset(fields)
 
     def format(self, record: logging.LogRecord) -> str:
         """
@@ -132,9 +595,50 @@ class RedactingFormatter(logging.Formatter):
         Returns:
             str: The formatted log record with filtered data.
         """
+        data = getattr(record, "data", None)
+        if isinstance(data, dict):
+            return self.format_structured(record, data)
         original_format = super().format(record)
-        return filter_datum(self.fields, self.REDACTION, original_format,
-                            self.SEPARATOR)
+        return self.redactor(original_format)
+
+    def format_structured(self, record: logging.LogRecord,
+                          data: Dict[str, Any]) -> str:
+        """
+        Redacts structured data by key and serializes the record once.
+
+        Args:
+            record (logging.LogRecord): The log record to be formatted.
+            data (Dict[str, Any]): Fields attached to the record.
+
+        Returns:
+            str: The formatted log record with filtered data.
+        """
+        redacted = {key: self.REDACTION if key in self._field_set else value
+                    for key, value in data.items()}
+        # Free text may still carry PII: redact it like unstructured records
+        message = self.redactor(record.getMessage())
+        exc_text = None
+        if record.exc_info:
+            exc_text = self.redactor(self.formatException(record.exc_info))
+
+        if self.structured_format == "json":
+            entry = {"name": record.name,
+                     "levelname": record.levelname,
+                     "asctime": self.formatTime(record, self.datefmt),
+                     "message": message,
+                     "data": redacted}
+            if exc_text is not None:
+                entry["exc_info"] = exc_text
+            return json.dumps(entry, default=str)
+
+        pairs = " ".join(f"{key}={value}{self.SEPARATOR}"
+                         for key, value in redacted.items())
+        structured = copy.copy(record)
+        structured.msg = f"{message} {pairs}" if message else pairs
+        structured.args = None
+        if exc_text is not None:
+            structured.exc_text = exc_text
+        return super().format(structured)
 
 
 if __name__ == "__main__":
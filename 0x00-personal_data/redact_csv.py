@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Command-line tool that redacts the PII columns of large CSV dumps shaped
+like user_data.csv, spreading the work across a pool of processes.
+
+Usage:
+    ./redact_csv.py user_data.csv redacted.csv [--workers N] [--chunk-mb M]
+"""
+
+import argparse
+import csv
+import io
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Sequence, Tuple
+from filtered_logger import PII_FIELDS, RedactingFormatter
+
+
+def find_chunks(mm: mmap.mmap, start: int,
+                chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Splits a mapped CSV file into byte ranges that end on record boundaries.
+
+    A newline only ends a record when it sits outside a quoted field, i.e.
+    when the number of quote characters since the previous boundary is even.
+
+    Args:
+        mm (mmap.mmap): The mapped input file.
+        start (int): Offset of the first data record.
+        chunk_size (int): Approximate size in bytes of each chunk.
+
+    Yields:
+        Tuple[int, int]: (start, end) offsets of each chunk.
+    """
+    size = len(mm)
+    quotes = 0
+    chunk_start = scan_from = start
+    while chunk_start < size:
+        candidate = max(chunk_start + chunk_size, scan_from)
+        if candidate >= size:
+            yield chunk_start, size
+            return
+        newline = mm.find(b"\n", candidate)
+        if newline == -1:
+            yield chunk_start, size
+            return
+        quotes += mm[scan_from:newline].count(b'"')
+        scan_from = newline + 1
+        if quotes % 2 == 0:
+            yield chunk_start, scan_from
+            chunk_start = scan_from
+            quotes = 0
+
+
+def redact_chunk(task: Tuple[str, int, int, Sequence[int], str, str]
+                 ) -> Tuple[bytes, int]:
+    """
+    Redacts one chunk of the input file. Runs in a worker process.
+
+    Args:
+        task (tuple): (path, start, end, columns, redaction, newline)
+                      where columns are the indexes of the fields to
+                      obfuscate and newline ends each output record.
+
+    Returns:
+        Tuple[bytes, int]: The redacted CSV bytes and the number of rows.
+    """
+    path, start, end, columns, redaction, newline = task
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode("utf-8")
+
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator=newline)
+    rows = 0
+    for row in csv.reader(io.StringIO(text, newline="")):
+        for column in columns:
+            if column < len(row):
+                row[column] = redaction
+        writer.writerow(row)
+        rows += 1
+    return out.getvalue().encode("utf-8"), rows
+
+
+def redact_file(input_path: str, output_path: str, fields: Sequence[str],
+                workers: int = None, chunk_size: int = 16 << 20,
+                redaction: str = RedactingFormatter.REDACTION) -> int:
+    """
+    Redacts the given columns of a CSV file into a new file, keeping the
+    original record order and the line endings of its header (LF or CRLF).
+
+    Args:
+        input_path (str): CSV file whose first line is the header.
+        output_path (str): Destination of the redacted CSV.
+        fields (Sequence[str]): Names of the columns to obfuscate.
+        workers (int): Number of worker processes; defaults to CPU count.
+        chunk_size (int): Approximate bytes handed to a worker at a time.
+        redaction (str): Replacement value for the columns.
+
+    Returns:
+        int: The number of data rows written.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows = 0
+    with open(input_path, "rb") as f, open(output_path, "wb") as out:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n") + 1 or len(mm)
+            header = mm[:header_end]
+            out.write(header)
+            newline = "\r\n" if header.endswith(b"\r\n") else "\n"
+            names = next(csv.reader([header.decode("utf-8")]))
+            columns = [i for i, name in enumerate(names) if name in fields]
+
+            # Keep a bounded window of chunks in flight and write results in
+            # submission order, so output order matches the input.
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for start, end in find_chunks(mm, header_end, chunk_size):
+                    pending.append(executor.submit(
+                        redact_chunk,
+                        (input_path, start, end, columns, redaction,
+                         newline)))
+                    if len(pending) >= workers * 2:
+                        data, count = pending.popleft().result()
+                        out.write(data)
+                        rows += count
+                while pending:
+                    data, count = pending.popleft().result()
+                    out.write(data)
+                    rows += count
+    return rows
+
+
+def main(argv: List[str] = None):
+    """ Parse the command line and redact the requested file. """
+    parser = argparse.ArgumentParser(
+        description="Redact PII columns of a CSV file in parallel.")
+    parser.add_argument("input", help="CSV file to redact")
+    parser.add_argument("output", help="where to write the redacted CSV")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=float, default=16,
+                        help="approximate chunk size in MiB (default: 16)")
+    parser.add_argument("--fields", nargs="+", default=list(PII_FIELDS),
+                        help="columns to redact (default: PII_FIELDS)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = redact_file(args.input, args.output, args.fields, args.workers,
+                       max(1, int(args.chunk_mb * (1 << 20))))
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    sys.stderr.write(f"{rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ BasicAuth module for managing basic HTTP authentication in a Flask application.
 
 from api.v1.auth.auth import Auth
 import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from models.user import User
 from typing import TypeVar
 
@@ -12,8 +17,32 @@ from typing import TypeVar
 class BasicAuth(Auth):
     """
     BasicAuth class for handling basic HTTP authentication.
+
+    Verified Authorization headers are cached, keyed by their SHA-256
+    digest, so repeated requests of a client skip decoding, the user lookup
+    and the password check. An entry lasts BASIC_AUTH_CACHE_TTL seconds
+    (default 300) and is dropped as soon as its user is removed or changes
+    password; at most BASIC_AUTH_CACHE_SIZE entries (default 1024, 0
+    disables the cache) are kept, evicting the least recently used.
     """
 
+    def __init__(self):
+        """
+        Initialize the credential cache based on environment variables
+        BASIC_AUTH_CACHE_SIZE and BASIC_AUTH_CACHE_TTL.
+        """
+        try:
+            self.cache_size = int(os.getenv('BASIC_AUTH_CACHE_SIZE', 1024))
+        except ValueError:
+            self.cache_size = 1024
+        try:
+            self.cache_ttl = float(os.getenv('BASIC_AUTH_CACHE_TTL', 300))
+        except ValueError:
+            self.cache_ttl = 300
+        # Header digest -> (user ID, email, password hash, expiration time)
+        self._credentials = OrderedDict()
+        self._credentials_lock = threading.Lock()
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
         """
@@ -125,7 +154,29 @@ class BasicAuth(Auth):
 
         # Get the authorization header from the request
         auth_header = self.authorization_header(request)
+        if self.cache_size > 0 and isinstance(auth_header, str):
+            key = hashlib.sha256(auth_header.encode()).digest()
+            user = self.cached_user(key)
+            if user is None:
+                user = self.user_from_authorization_header(auth_header)
+                if user is not None:
+                    self.cache_user(key, user)
+            return user
+        return self.user_from_authorization_header(auth_header)
+
+    def user_from_authorization_header(
+            self, auth_header: str) -> TypeVar('User'):
+        """
+        Retrieves the User instance matching the credentials of an
+        Authorization header.
 
+        Args:
+            auth_header (str): The content of the Authorization header.
+
+        Returns:
+            UserType: The User instance if authentication is successful;
+                      otherwise, None.
+        """
         # Extract and decode the Base64 part of the authorization header
         base64_auth_header = self.extract_base64_authorization_header(
             auth_header)
@@ -147,3 +198,49 @@ class BasicAuth(Auth):
         # Retrieve the user object from credentials
         user = self.user_object_from_credentials(user_email, user_pwd)
         return user
+
+    def cached_user(self, key: bytes) -> TypeVar('User'):
+        """
+        Retrieves the User instance cached for an Authorization header.
+
+        Args:
+            key (bytes): The SHA-256 digest of the Authorization header.
+
+        Returns:
+            UserType: The User instance if the entry exists, has not
+                      expired, and its user still exists with the same
+                      email and password; otherwise, None (and the entry
+                      is dropped).
+        """
+        with self._credentials_lock:
+            entry = self._credentials.get(key)
+            if entry is None:
+                return None
+            self._credentials.move_to_end(key)
+        user_id, email, password, expires_at = entry
+        if time.monotonic() < expires_at:
+            user = User.get(user_id)
+            if (user is not None and user.email == email
+                    and user.password == password):
+                return user
+        with self._credentials_lock:
+            if self._credentials.get(key) is entry:
+                del self._credentials[key]
+        return None
+
+    def cache_user(self, key: bytes, user: TypeVar('User')):
+        """
+        Caches the User instance verified for an Authorization header,
+        evicting the least recently used entries beyond the cache size.
+
+        Args:
+            key (bytes): The SHA-256 digest of the Authorization header.
+            user (User): The authenticated User instance.
+        """
+        entry = (user.id, user.email, user.password,
+                 time.monotonic() + self.cache_ttl)
+        with self._credentials_lock:
+            self._credentials[key] = entry
+            self._credentials.move_to_end(key)
+            while len(self._credentials) > self.cache_size:
+                self._credentials.popitem(last=False)
@@ -2,18 +2,72 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
+from models.base import to_json_array
 from models.user import User
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: maximum number of users to return, ordered by ID
+      - after: ID of the last user of the previous page
+      - stream: `json` or `ndjson` to serialize users incrementally
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, or one page of them
+        with the `after` value of the next page in the X-Next-After header
+      - 400 if limit is not a positive integer or stream is unknown
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    stream = request.args.get('stream')
+    if limit is None and after is None and stream is None:
+        return _json_response(to_json_array(User.all()))
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': "stream must be json or ndjson"}), 400
+
+    users, next_after = User.page(limit, after)
+    if stream is None:
+        response = _json_response(to_json_array(users))
+    elif stream == 'ndjson':
+        response = Response(_ndjson_lines(users),
+                            mimetype='application/x-ndjson')
+    else:
+        response = Response(_json_array(users), mimetype='application/json')
+    if next_after is not None:
+        response.headers['X-Next-After'] = next_after
+    return response
+
+
+def _json_array(users: list):
+    """ Yield a JSON array of users one element at a time
+    """
+    yield '['
+    for i, user in enumerate(users):
+        yield (',' if i else '') + user.to_json_string(cache=False)
+    yield ']\n'
+
+
+def _ndjson_lines(users: list):
+    """ Yield one JSON line per user
+    """
+    for user in users:
+        yield user.to_json_string(cache=False) + '\n'
+
+
+def _json_response(text: str, status: int = 200) -> Response:
+    """ Response of an already serialized JSON document
+    """
+    return Response(text + '\n', status=status, mimetype='application/json')
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -30,7 +84,7 @@ def view_one_user(user_id: str = None) -> str:
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return _json_response(user.to_json_string())
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -83,7 +137,7 @@ def create_user() -> str:
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
             user.save()
-            return jsonify(user.to_json()), 201
+            return _json_response(user.to_json_string(), 201)
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
@@ -119,4 +173,4 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return _json_response(user.to_json_string())
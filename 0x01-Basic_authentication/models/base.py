@@ -1,20 +1,251 @@
 #!/usr/bin/env python3
 """ Base module
 """
+from contextlib import contextmanager
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from typing import TypeVar, List, Iterable, Iterator, Tuple, Callable
+from os import getenv, path
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from operator import attrgetter
+import atexit
+import codecs
+import fcntl
+import gc
 import json
+import mmap
+import os
+import sys
+import threading
+import time
 import uuid
+from models.rwlock import ReadWriteLock
+from models import query, snapshot
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+# Secondary indexes: class name -> attribute -> value -> {id: None}
+INDEXES = {}
+# Indexed values of each stored object: class name -> id -> {attribute: value}
+INDEXED_VALUES = {}
+# Number of records in each class journal since the last compaction
+JOURNAL_LENGTHS = {}
+# Sorted object ids, built on first paginated read: class name -> [id]
+SORTED_IDS = {}
+# Write-behind changes not yet on disk: class name -> {id: None}
+PENDING = {}
+# Write-behind flushers: class name -> (class, event waking its thread)
+FLUSHERS = {}
+# Files last applied to DATA: class name -> {"snapshot": signatures of
+# the snapshot files, "journal": (inode, offset read up to), "checked": time}
+SYNC_STATES = {}
+# Guards each class' entry in the dicts above: class name -> lock
+LOCKS = {}
+_locks_lock = threading.Lock()
+_pending_lock = threading.Lock()
+# Serializes file writes; always taken before a class lock, never after
+_flush_lock = threading.RLock()
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string, through the C ISO-8601 parser when
+    the string has the exact YYYY-MM-DDTHH:MM:SS shape
+    """
+    if (len(value) == 19 and value[4] == value[7] == '-'
+            and value[10] == 'T' and value[13] == value[16] == ':'
+            and value.isascii()):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def file_signature(file_path: str) -> Tuple[int, int, int]:
+    """ (inode, modification time in ns, size) of a file, or None if it
+    does not exist
+    """
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a datetime with TIMESTAMP_FORMAT, through isoformat when the
+    result is identical
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(timespec='seconds')
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def same_values(a: object, b: object) -> bool:
+    """ Whether two attribute values are equal with the same types, down
+    through tuples, lists and dicts, so that they serialize the same way
+    (1, 1.0 and True are equal but not the same values)
+    """
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if type(a) in (tuple, list):
+        return len(a) == len(b) and all(map(same_values, a, b))
+    if type(a) is dict:
+        return a.keys() == b.keys() and all(
+            same_values(value, b[key]) for key, value in a.items())
+    return a == b
+
+
+def iter_json_items(file_path: str,
+                    chunk_size: int = 1 << 20) -> Iterator[Tuple[str, dict]]:
+    """ Yield the (key, value) pairs of a file holding one JSON object,
+    parsing them one at a time from a memory map so only the current pair
+    and a chunk-sized window of text are held in memory
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Empty JSON file: {}".format(file_path))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            utf8 = codecs.getincrementaldecoder("utf-8")()
+            state = {"buf": "", "pos": 0, "offset": 0}
+
+            def fill() -> bool:
+                """ Append the next chunk to the window, False at EOF """
+                if state["offset"] >= len(mm):
+                    return False
+                end = state["offset"] + chunk_size
+                chunk = mm[state["offset"]:end]
+                state["offset"] = end
+                text = utf8.decode(chunk, state["offset"] >= len(mm))
+                buf, pos = state["buf"], state["pos"]
+                state["buf"], state["pos"] = buf[pos:] + text, 0
+                return True
+
+            def peek() -> str:
+                """ Skip whitespace and return the next char """
+                while True:
+                    buf, pos = state["buf"], state["pos"]
+                    while pos < len(buf) and buf[pos] in " \t\n\r":
+                        pos += 1
+                    state["pos"] = pos
+                    if pos < len(buf):
+                        return buf[pos]
+                    if not fill():
+                        raise ValueError("Truncated JSON file")
+
+            def consume(expected: str) -> str:
+                """ Consume the next char, which must be in expected """
+                char = peek()
+                if char not in expected:
+                    raise ValueError("Expected one of {!r}, got {!r}"
+                                     .format(expected, char))
+                state["pos"] += 1
+                return char
+
+            def decode():
+                """ Decode the next value, growing the window if needed """
+                peek()
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(state["buf"],
+                                                        state["pos"])
+                        # A number cut at the window edge decodes fine
+                        if end < len(state["buf"]) or not fill():
+                            state["pos"] = end
+                            return value
+                    except json.JSONDecodeError:
+                        if not fill():
+                            raise
+
+            fill()
+            consume("{")
+            if peek() == "}":
+                return
+            while True:
+                if peek() != '"':
+                    consume('"')
+                key = decode()
+                consume(":")
+                value = decode()
+                yield key, value
+                if consume(",}") == "}":
+                    return
 
 
 class Base():
     """ Base class
+
+    Subclasses list in `indexed_attributes` the attributes `search` can
+    resolve through a hash index instead of scanning every object. Indexes
+    reflect the values objects had when they were last saved or loaded (see
+    search for what that means for unsaved changes).
+    search, iter and first accept the comparisons of models.query
+    (`{"created_at__lt": t}`) and a `where` predicate on each object.
+
+    `persistence` selects how writes reach disk: "snapshot" rewrites the
+    whole .db_<Class>.json file on every save/remove, "journal" appends one
+    record to .db_<Class>.journal and folds the journal back into the
+    snapshot once it holds more than `journal_compact_threshold` records
+    and more records than there are objects.
+
+    Instances store their attributes in __slots__ rather than a per-object
+    __dict__; subclasses declare their own attributes in `__slots__` too
+    (a subclass without `__slots__` simply gets a __dict__ back).
+
+    to_json_string() caches the JSON text of an object, with the attribute
+    values it was built from, and rebuilds it as soon as any of them
+    differs, as after a save. Listings (to_json_array) reuse cached texts
+    but do not cache the others, so only objects served on their own, such
+    as the current user, keep one.
+
+    With `write_behind` enabled, save/remove only update memory and queue
+    the change; a background thread writes queued changes at most once per
+    `flush_interval` seconds, or as soon as `flush_threshold` objects are
+    waiting. `flush()` writes them immediately and runs at process exit.
+
+    `snapshot_format` selects the snapshot file save_to_file writes:
+    "json" (.db_<Class>.json) or "binary" (.db_<Class>.bin, see
+    models.snapshot), which loads several times faster. Loading reads
+    whichever of the two files is newer, so switching formats needs no
+    conversion.
+
+    With a positive `sync_interval` (MODELS_SYNC_INTERVAL, in seconds),
+    several processes can share the files of a class: reads check at most
+    once per interval whether they changed on disk, replaying only the new
+    records when the journal grew and reloading everything when a snapshot
+    was rewritten. Writes then always go through the journal, appended
+    under a shared lock of .db_<Class>.lock; compaction takes it
+    exclusively and first folds in the records of other processes.
+
+    Reads (get, search, all, count, page) share a per-class reader-writer
+    lock; save, remove and load_from_file take it exclusively, so the API
+    can serve requests from several threads.
+
+    Setting `storage` to a backend such as SQLiteStorage moves the objects
+    out of DATA and the JSON files: every operation above is delegated to
+    it. MODELS_STORAGE=sqlite selects SQLiteStorage on MODELS_SQLITE_PATH.
     """
+    indexed_attributes = ()
+    persistence = getenv("MODELS_PERSISTENCE", "snapshot")
+    journal_compact_threshold = 1000
+    snapshot_format = getenv("MODELS_SNAPSHOT_FORMAT", "json")
+    sync_interval = float(getenv("MODELS_SYNC_INTERVAL", "0"))
+    write_behind = getenv("MODELS_WRITE_BEHIND", "0") == "1"
+    flush_interval = 1.0
+    flush_threshold = 100
+    storage = None
+    __slots__ = ("id", "created_at", "updated_at", "_json_cache")
+
+    def __init_subclass__(cls, **kwargs):
+        """ Collect the slot names of a new model class
+        """
+        super().__init_subclass__(**kwargs)
+        cls._fields = _slot_names(cls)
+        cls._get_fields = attrgetter(*cls._fields)
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
@@ -22,16 +253,20 @@ class Base():
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
+        if INDEXES.get(s_class) is None:
+            INDEXES[s_class] = {attr: {} for attr in self.indexed_attributes}
+            INDEXED_VALUES[s_class] = {}
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        if 'id' in kwargs:
+            self.id = kwargs['id']
+        else:
+            self.id = str(uuid.uuid4())
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
@@ -47,66 +282,495 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
+        return self._serialize(for_serialization)
+
+    def to_json_string(self, cache: bool = True) -> str:
+        """ JSON text of to_json(), with sorted keys; with cache=False a
+        text that is not cached yet is built without being kept
+        """
+        state = self._state()
+        cached = getattr(self, "_json_cache", None)
+        if cached is not None and same_values(cached[0], state):
+            return cached[1]
+        text = json.dumps(self._serialize(False), sort_keys=True,
+                          separators=(',', ':'))
+        if cache:
+            self._json_cache = (state, text)
+        return text
+
+    def _serialize(self, for_serialization: bool) -> dict:
+        """ Build the JSON dictionary of the object
+        """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._attributes():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
 
+    def _state(self) -> tuple:
+        """ Attribute values the cached JSON text is built from
+        """
+        try:
+            state = self._get_fields(self)
+        except AttributeError:
+            state = tuple(self._attributes())
+        extra = getattr(self, "__dict__", None)
+        if extra:
+            state = (state, tuple(extra.items()))
+        return state
+
+    def _attributes(self) -> Iterator[Tuple[str, object]]:
+        """ Yield (name, value) of every attribute set on the object
+        """
+        for name in self._fields:
+            try:
+                yield name, getattr(self, name)
+            except AttributeError:
+                continue
+        extra = getattr(self, "__dict__", None)
+        if extra:
+            yield from extra.items()
+
+    @classmethod
+    def _lock(cls) -> ReadWriteLock:
+        """ Reader-writer lock of the class, created on first use
+        """
+        s_class = cls.__name__
+        lock = LOCKS.get(s_class)
+        if lock is None:
+            with _locks_lock:
+                lock = LOCKS.setdefault(s_class, ReadWriteLock())
+        return lock
+
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, replaying the journal if any
+        """
+        if cls.storage is not None:
+            cls.storage.load(cls)
+            return
+        cls.flush()
+        with cls._lock().write():
+            cls._load()
+
+    @classmethod
+    def _load(cls):
+        """ Replace the objects of the class with the ones on file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
         DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        SORTED_IDS.pop(s_class, None)
+        JOURNAL_LENGTHS[s_class] = 0
+        cls._rebuild_indexes()
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
+        # Taken before reading: a snapshot replaced meanwhile is reloaded
+        # on the next sync
+        snapshot_state = cls._snapshot_signature()
+        # Building many objects at once triggers collections that find
+        # nothing to free: pause the cyclic garbage collector meanwhile
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for obj_id, obj_json in cls._read_snapshot():
                 DATA[s_class][obj_id] = cls(**obj_json)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        journal_path = ".db_{}.journal".format(s_class)
+        journal_state = None
+        if path.exists(journal_path):
+            journal_state = cls._replay_journal(journal_path)
+        cls._rebuild_indexes()
+        SYNC_STATES[s_class] = {"snapshot": snapshot_state,
+                                "journal": journal_state,
+                                "checked": time.monotonic()}
+
+    @classmethod
+    def _replay_journal(cls, journal_path: str,
+                        offset: int = 0) -> Tuple[int, int]:
+        """ Replay the journal records from the byte offset, and return
+        (inode of the journal, offset after its last complete record), or
+        None if the journal no longer exists
+        """
+        s_class = cls.__name__
+        try:
+            f = open(journal_path, 'r+b')
+        except FileNotFoundError:
+            return None
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write at the end of the journal: drop it so the
+                    # next append starts on a fresh line. In sync mode it
+                    # may be another process' append in progress instead.
+                    if cls.sync_interval <= 0:
+                        f.truncate(offset)
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Remains of a torn write another append followed
+                    continue
+                cls._replay(record)
+                JOURNAL_LENGTHS[s_class] += 1
+        return inode, offset
+
+    @classmethod
+    def _snapshot_signature(cls) -> tuple:
+        """ File signatures of the JSON and binary snapshots of the class
+        """
+        s_class = cls.__name__
+        return (file_signature(".db_{}.json".format(s_class)),
+                file_signature(".db_{}.bin".format(s_class)))
+
+    @classmethod
+    def _file_changes(cls, state: dict) -> str:
+        """ How the files differ from the state last applied to DATA:
+        None, "journal" (new records only) or "reload"
+        """
+        if cls._snapshot_signature() != state["snapshot"]:
+            return "reload"
+        journal = file_signature(".db_{}.journal".format(cls.__name__))
+        known = state["journal"]
+        if journal is None:
+            return None if known is None else "reload"
+        if known is None:
+            return "journal"
+        inode, offset = known
+        if journal[0] != inode or journal[2] < offset:
+            return "reload"
+        return "journal" if journal[2] > offset else None
+
+    @classmethod
+    def _sync(cls):
+        """ Apply the changes other processes wrote to the files of the
+        class, checking at most once per sync_interval
+        """
+        if cls.sync_interval <= 0:
+            return
+        state = SYNC_STATES.get(cls.__name__)
+        if state is not None:
+            now = time.monotonic()
+            if now - state["checked"] < cls.sync_interval:
+                return
+            state["checked"] = now
+            if cls._file_changes(state) is None:
+                return
+        cls.flush()
+        with cls._lock().write():
+            cls._catch_up()
+
+    @classmethod
+    def _catch_up(cls):
+        """ Bring DATA up to date with the files: replay the records
+        appended to the journal since it was last read, or reload
+        everything. The class write lock must be held
+        """
+        s_class = cls.__name__
+        state = SYNC_STATES.get(s_class)
+        change = "reload" if state is None else cls._file_changes(state)
+        if change == "journal":
+            _, offset = state["journal"] or (None, 0)
+            state["journal"] = cls._replay_journal(
+                ".db_{}.journal".format(s_class), offset)
+        elif change == "reload":
+            cls._load()
+
+    @classmethod
+    @contextmanager
+    def _file_lock(cls, exclusive: bool = False):
+        """ In sync mode, lock of the class files shared with the other
+        processes: shared to append to the journal, exclusive to compact
+        """
+        if cls.sync_interval <= 0:
+            yield
+            return
+        with open(".db_{}.lock".format(cls.__name__), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    @classmethod
+    def _read_snapshot(cls) -> Iterator[Tuple[str, dict]]:
+        """ Iterator of (id, serialized object) from the newest snapshot file,
+        falling back to JSON when the binary one cannot be read
+        """
+        s_class = cls.__name__
+        json_path = ".db_{}.json".format(s_class)
+        bin_path = ".db_{}.bin".format(s_class)
+        if path.exists(bin_path) and (
+                not path.exists(json_path)
+                or path.getmtime(bin_path) >= path.getmtime(json_path)):
+            try:
+                return snapshot.read_snapshot(bin_path)
+            except ValueError:
+                pass
+        if path.exists(json_path):
+            return iter_json_items(json_path)
+        return iter(())
+
+    @classmethod
+    def _replay(cls, record: dict):
+        """ Apply one journal record to DATA
+        """
+        if record.get("op") == "save":
+            cls._store(cls(**record["obj"]))
+        elif record.get("op") == "remove":
+            cls._discard(record["id"])
 
     @classmethod
     def save_to_file(cls):
-        """ Save all objects to file
+        """ Save all objects to file, which also compacts the journal
         """
+        if cls.storage is not None:
+            return
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        json_path = ".db_{}.json".format(s_class)
+        bin_path = ".db_{}.bin".format(s_class)
+        with _flush_lock, cls._file_lock(exclusive=True):
+            if cls.sync_interval > 0:
+                # Keep the records other processes appended meanwhile
+                with cls._lock().write():
+                    cls._catch_up()
+            objs_json = {}
+            with cls._lock().read():
+                for obj_id, obj in DATA[s_class].items():
+                    objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            if cls.snapshot_format == "binary":
+                snapshot.write_snapshot(bin_path, objs_json)
+                stale_path = json_path
+            else:
+                # Write aside then rename, so readers never see a partial
+                # file
+                tmp_path = "{}.{}.tmp".format(json_path, os.getpid())
+                with open(tmp_path, 'w') as f:
+                    json.dump(objs_json, f)
+                os.replace(tmp_path, json_path)
+                stale_path = bin_path
+            if path.exists(stale_path):
+                os.remove(stale_path)
+
+            # The snapshot now holds every journaled change
+            journal_path = ".db_{}.journal".format(s_class)
+            if path.exists(journal_path):
+                os.remove(journal_path)
+            JOURNAL_LENGTHS[s_class] = 0
+            state = SYNC_STATES.get(s_class)
+            if state is not None:
+                state["snapshot"] = cls._snapshot_signature()
+                state["journal"] = None
+
+    @classmethod
+    def _append_journal(cls, *records: dict):
+        """ Append records to the journal, compacting when it is long
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        data = "".join(json.dumps(record) + "\n" for record in records)
+        data = data.encode()
+        with cls._file_lock(), open(journal_path, 'a+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                # Start on a fresh line even after a torn write
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            end = f.tell()
+            inode = os.fstat(f.fileno()).st_ino
+        state = SYNC_STATES.get(s_class)
+        if state is not None:
+            known = state["journal"] or (inode, 0)
+            if known == (inode, end - len(data)):
+                # No other process appended since the journal was last
+                # read: the next sync can skip these records
+                state["journal"] = (inode, end)
+        length = JOURNAL_LENGTHS.get(s_class, 0) + len(records)
+        JOURNAL_LENGTHS[s_class] = length
+        if length > max(cls.journal_compact_threshold, len(DATA[s_class])):
+            cls.save_to_file()
+
+    @classmethod
+    def _persist(cls, *obj_ids: str):
+        """ Write the changes of objects to disk, or queue them in
+        write-behind mode
+        """
+        s_class = cls.__name__
+        if not cls.write_behind:
+            with _flush_lock:
+                cls._write(*obj_ids)
+            return
+
+        with _pending_lock:
+            pending = PENDING.setdefault(s_class, {})
+            pending.update(dict.fromkeys(obj_ids))
+            waiting = len(pending)
+        event = cls._flusher()
+        if waiting >= cls.flush_threshold:
+            event.set()
+
+    @classmethod
+    def _write(cls, *obj_ids: str):
+        """ Write changed objects with the class persistence mode. Journal
+        records are taken from the current state of the objects, so racing
+        writers cannot leave an outdated record last
+        """
+        if cls.persistence != "journal" and cls.sync_interval <= 0:
+            cls.save_to_file()
+            return
+        s_class = cls.__name__
+        records = []
+        with cls._lock().read():
+            for obj_id in obj_ids:
+                obj = DATA[s_class].get(obj_id)
+                if obj is None:
+                    records.append({"op": "remove", "id": obj_id})
+                else:
+                    records.append({"op": "save", "id": obj_id,
+                                    "obj": obj.to_json(True)})
+        cls._append_journal(*records)
+
+    @classmethod
+    def flush(cls):
+        """ Write the changes queued in write-behind mode
+        """
+        s_class = cls.__name__
+        with _flush_lock:
+            with _pending_lock:
+                pending = PENDING.pop(s_class, None)
+            if not pending:
+                return
+            try:
+                cls._write(*pending)
+            except Exception:
+                # Keep the changes queued, behind any newer ones
+                with _pending_lock:
+                    newer = PENDING.get(s_class, {})
+                    pending.update(newer)
+                    PENDING[s_class] = pending
+                raise
+
+    @classmethod
+    def _flusher(cls) -> threading.Event:
+        """ Event waking the background flusher of the class, started on
+        first use
+        """
+        s_class = cls.__name__
+        with _pending_lock:
+            if s_class not in FLUSHERS:
+                event = threading.Event()
+                FLUSHERS[s_class] = (cls, event)
+                threading.Thread(target=cls._flush_loop, args=(event,),
+                                 name="flush-{}".format(s_class),
+                                 daemon=True).start()
+            return FLUSHERS[s_class][1]
+
+    @classmethod
+    def _flush_loop(cls, event: threading.Event):
+        """ Flush queued changes every flush_interval or when woken up
+        """
+        while True:
+            event.wait(cls.flush_interval)
+            event.clear()
+            try:
+                cls.flush()
+            except Exception as e:
+                # Changes stay queued for the next round
+                sys.stderr.write("{} write-behind flush failed: {}: {}\n"
+                                 .format(cls.__name__, type(e).__name__, e))
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        if self.storage is not None:
+            self.storage.save(self)
+            return
+        with self._lock().write():
+            self.__class__._store(self)
+        self.__class__._persist(self.id)
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save objects of the class at once: they are stored and indexed
+        in one pass, then written to disk in a single write
+        """
+        objs = list(objs)
+        if not objs:
+            return
+        now = datetime.utcnow()
+        for obj in objs:
+            obj.updated_at = now
+        if cls.storage is not None:
+            cls.storage.save_many(objs)
+            return
+        s_class = cls.__name__
+        with cls._lock().write():
+            stored = DATA[s_class]
+            if any(obj.id not in stored for obj in objs):
+                # Rebuilt on the next paginated read
+                SORTED_IDS.pop(s_class, None)
+            for obj in objs:
+                stored[obj.id] = obj
+                cls._index(obj)
+        cls._persist(*(obj.id for obj in objs))
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        if self.storage is not None:
+            self.storage.remove(self.__class__, self.id)
+            return
+        with self._lock().write():
+            if not self.__class__._discard(self.id):
+                return
+        self.__class__._persist(self.id)
+
+    @classmethod
+    def _store(cls, obj: TypeVar('Base')):
+        """ Put an object in DATA, the indexes and the sorted IDs
+        """
+        s_class = cls.__name__
+        if obj.id not in DATA[s_class] and s_class in SORTED_IDS:
+            insort(SORTED_IDS[s_class], obj.id)
+        DATA[s_class][obj.id] = obj
+        cls._index(obj)
+
+    @classmethod
+    def _discard(cls, obj_id: str) -> bool:
+        """ Take an object out of DATA, the indexes and the sorted IDs;
+        False if it was not stored
+        """
+        s_class = cls.__name__
+        if DATA[s_class].pop(obj_id, None) is None:
+            return False
+        ids = SORTED_IDS.get(s_class)
+        if ids is not None:
+            i = bisect_left(ids, obj_id)
+            if i < len(ids) and ids[i] == obj_id:
+                del ids[i]
+        cls._unindex(obj_id)
+        return True
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
+        if cls.storage is not None:
+            return cls.storage.count(cls)
+        cls._sync()
         s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        with cls._lock().read():
+            return len(DATA[s_class].keys())
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -114,24 +778,190 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, limit: int = None,
+             after: str = None) -> Tuple[List[TypeVar('Base')], str]:
+        """ Return up to `limit` objects ordered by ID, starting after the
+        ID `after`, and the cursor of the next page (None on the last one)
+        """
+        if cls.storage is not None:
+            return cls.storage.page(cls, limit, after)
+        cls._sync()
+        s_class = cls.__name__
+        with cls._lock().read():
+            ids = SORTED_IDS.get(s_class)
+            if ids is None:
+                ids = SORTED_IDS[s_class] = sorted(DATA[s_class])
+            start = 0 if after is None else bisect_right(ids, after)
+            end = len(ids) if limit is None else min(start + limit, len(ids))
+            objs = DATA[s_class]
+            page = [objs[obj_id] for obj_id in ids[start:end]]
+            next_after = ids[end - 1] if start < end < len(ids) else None
+        return page, next_after
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
+        if cls.storage is not None:
+            return cls.storage.get(cls, id)
+        cls._sync()
         s_class = cls.__name__
-        return DATA[s_class].get(id)
+        with cls._lock().read():
+            return DATA[s_class].get(id)
+
+    @classmethod
+    def search(cls, attributes: dict = {}, limit: int = None,
+               where: Callable = None) -> List[TypeVar('Base')]:
+        """ Search objects with matching attributes, stopping once `limit`
+        objects are found
+
+        Equality and "in" conditions on indexed attributes only look at the
+        objects indexed under the searched values, and every candidate is
+        checked against its current values. An object whose indexed
+        attribute was changed but not saved yet is therefore found by
+        neither its old value nor its new one until save() (or a search
+        without that condition); iter and first behave the same.
+        """
+        if cls.storage is not None:
+            return cls.storage.search(cls, attributes, limit, where)
+        cls._sync()
+        conditions = query.parse(attributes)
+        with cls._lock().read():
+            found = (obj for obj in cls._candidates(conditions)
+                     if query.matches(obj, conditions, where))
+            return list(islice(found, limit))
+
+    @classmethod
+    def iter(cls, attributes: dict = {},
+             where: Callable = None) -> Iterator[TypeVar('Base')]:
+        """ Lazily yield objects with matching attributes
+
+        The objects to examine are fixed when iteration starts; they are
+        filtered as the caller consumes them, without holding the lock.
+        """
+        if cls.storage is not None:
+            yield from cls.storage.iter(cls, attributes, where)
+            return
+        cls._sync()
+        conditions = query.parse(attributes)
+        with cls._lock().read():
+            candidates = list(cls._candidates(conditions))
+        for obj in candidates:
+            if query.matches(obj, conditions, where):
+                yield obj
+
+    @classmethod
+    def first(cls, attributes: dict = {},
+              where: Callable = None) -> TypeVar('Base'):
+        """ Return the first object with matching attributes, or None
+        """
+        found = cls.search(attributes, 1, where)
+        return found[0] if found else None
 
     @classmethod
-    def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
-        """ Search all objects with matching attributes
+    def _candidates(cls, conditions: List[Tuple[str, str, object]]
+                    ) -> Iterable[TypeVar('Base')]:
+        """ Objects that may meet the conditions: the smallest index entry
+        among the eq/in conditions on indexed attributes, or every object
         """
         s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        objs = DATA[s_class]
+        indexes = INDEXES.get(s_class, {})
+        best = None
+        for name, op, value in conditions:
+            index = indexes.get(name)
+            if index is None:
+                continue
+            try:
+                if op == "eq":
+                    ids = index.get(value, {})
+                elif op == "in" and type(value) in query.COLLECTIONS:
+                    ids = {}
+                    for v in value:
+                        ids.update(index.get(v, {}))
+                else:
+                    continue
+            except TypeError:
+                continue
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return objs.values()
+        return [objs[obj_id] for obj_id in best if obj_id in objs]
+
+    @classmethod
+    def _index(cls, obj: TypeVar('Base')):
+        """ Add or refresh the index entries of an object
+        """
+        s_class = cls.__name__
+        if obj.id in INDEXED_VALUES[s_class]:
+            cls._unindex(obj.id)
+        values = {}
+        for attr, index in INDEXES[s_class].items():
+            value = getattr(obj, attr, None)
+            try:
+                index.setdefault(value, {})[obj.id] = None
+            except TypeError:
+                continue
+            values[attr] = value
+        INDEXED_VALUES[s_class][obj.id] = values
+
+    @classmethod
+    def _unindex(cls, obj_id: str):
+        """ Drop the index entries of an object
+        """
+        s_class = cls.__name__
+        values = INDEXED_VALUES[s_class].pop(obj_id, {})
+        for attr, value in values.items():
+            ids = INDEXES[s_class][attr].get(value)
+            if ids is not None:
+                ids.pop(obj_id, None)
+                if not ids:
+                    del INDEXES[s_class][attr][value]
+
+    @classmethod
+    def _rebuild_indexes(cls):
+        """ Rebuild the indexes of a class from DATA
+        """
+        s_class = cls.__name__
+        INDEXES[s_class] = {attr: {} for attr in cls.indexed_attributes}
+        INDEXED_VALUES[s_class] = {}
+        for obj in DATA.get(s_class, {}).values():
+            cls._index(obj)
+
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    """ Slot attribute names of a class, base classes first
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots
+                     if name not in ("__dict__", "__weakref__", "_json_cache"))
+    return tuple(names)
+
+
+def to_json_array(objs: Iterable[Base]) -> str:
+    """ JSON array of the to_json() of objects, without caching the JSON
+    text of each of them
+    """
+    return "[" + ",".join(obj.to_json_string(cache=False)
+                          for obj in objs) + "]"
+
+
+Base._fields = _slot_names(Base)
+Base._get_fields = attrgetter(*Base._fields)
+if getenv("MODELS_STORAGE", "json") == "sqlite":
+    from models.sqlite_storage import SQLiteStorage
+    Base.storage = SQLiteStorage(getenv("MODELS_SQLITE_PATH", ".db.sqlite3"))
+
+
+@atexit.register
+def flush_all():
+    """ Flush the write-behind changes of every model class
+    """
+    for cls, _ in list(FLUSHERS.values()):
+        cls.flush()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+""" Query module
+
+Search attributes map an attribute name to the value it must equal, or
+`<attribute>__<operator>` to the operand of another comparison:
+
+    {"email": "bob@hbtn.io"}                      email == "bob@hbtn.io"
+    {"created_at__lt": datetime(2024, 1, 1)}      created_at < 2024-01-01
+    {"last_name__in": ["Dylan", "Marley"]}         last_name in [...]
+
+Operators: eq, ne, lt, lte, gt, gte, in. A comparison that cannot be made
+(such as None < datetime) does not match.
+"""
+from typing import Callable, List, Tuple, TypeVar
+import operator
+
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, values: value in values,
+}
+# Operand types of "in" that are collections of values, not a substring
+COLLECTIONS = (list, tuple, set, frozenset)
+
+
+def parse(attributes: dict) -> List[Tuple[str, str, object]]:
+    """ Split search attributes into (attribute, operator, operand)
+    """
+    conditions = []
+    for key, value in attributes.items():
+        name, sep, op = key.rpartition("__")
+        if not name or op not in OPERATORS:
+            name, op = key, "eq"
+        conditions.append((name, op, value))
+    return conditions
+
+
+def matches(obj: TypeVar('Base'), conditions: List[Tuple[str, str, object]],
+            where: Callable = None) -> bool:
+    """ Whether an object meets every condition and the `where` predicate
+    """
+    for name, op, value in conditions:
+        try:
+            if not OPERATORS[op](getattr(obj, name), value):
+                return False
+        except TypeError:
+            return False
+    return where is None or bool(where(obj))
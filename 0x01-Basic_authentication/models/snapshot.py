@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+""" Binary snapshot module
+
+A binary snapshot holds the same objects as a .db_<Class>.json file in a
+versioned, marshal-encoded layout: attribute names are stored once and each
+object is a tuple of values in that order, which loads several times faster
+than JSON. Snapshots are only meant to be read by the process that wrote
+them or by trusted tools: marshal data must never come from untrusted input.
+
+Offline conversion:
+    python3 -m models.snapshot to-binary .db_User.json [...]
+    python3 -m models.snapshot to-json .db_User.bin [...]
+"""
+from typing import Dict, Iterator, List, Tuple
+import argparse
+import json
+import marshal
+import os
+
+
+MAGIC = b"BASESNAP"
+VERSION = 1
+MARSHAL_VERSION = 4
+# Value stored for the attributes an object does not have
+MISSING = Ellipsis
+
+
+def write_snapshot(file_path: str, objs_json: Dict[str, dict]):
+    """ Write serialized objects (id -> to_json(True)) to a binary snapshot,
+    atomically replacing file_path
+    """
+    fields = []
+    positions = {}
+    for obj_json in objs_json.values():
+        for key in obj_json:
+            if key not in positions:
+                positions[key] = len(fields)
+                fields.append(key)
+    rows = []
+    for obj_json in objs_json.values():
+        row = [MISSING] * len(fields)
+        for key, value in obj_json.items():
+            row[positions[key]] = value
+        rows.append(tuple(row))
+
+    payload = marshal.dumps((VERSION, tuple(fields), rows), MARSHAL_VERSION)
+    tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(payload)
+    os.replace(tmp_path, file_path)
+
+
+def read_snapshot(file_path: str) -> Iterator[Tuple[str, dict]]:
+    """ Return an iterator of (id, serialized object) pairs from a binary
+    snapshot; raise ValueError right away if the file is not a snapshot
+    of a supported version
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a binary snapshot: {}".format(file_path))
+        try:
+            version, fields, rows = marshal.loads(f.read())
+        except (EOFError, TypeError, ValueError):
+            raise ValueError("Corrupt snapshot: {}".format(file_path))
+    if version != VERSION:
+        raise ValueError("Unsupported snapshot version {} in {}".format(
+            version, file_path))
+    return _iter_rows(fields, rows)
+
+
+def _iter_rows(fields: Tuple[str, ...],
+               rows: List[tuple]) -> Iterator[Tuple[str, dict]]:
+    """ Rebuild serialized objects from snapshot rows """
+    for row in rows:
+        obj_json = dict(zip(fields, row))
+        if MISSING in row:
+            obj_json = {key: value for key, value in obj_json.items()
+                        if value is not MISSING}
+        yield obj_json["id"], obj_json
+
+
+def _convert(paths: List[str], to_binary: bool):
+    """ Convert snapshot files next to themselves """
+    from models.base import iter_json_items
+
+    for file_path in paths:
+        stem = os.path.splitext(file_path)[0]
+        if to_binary:
+            objs_json = dict(iter_json_items(file_path))
+            out_path = stem + ".bin"
+            write_snapshot(out_path, objs_json)
+        else:
+            objs_json = dict(read_snapshot(file_path))
+            out_path = stem + ".json"
+            tmp_path = "{}.{}.tmp".format(out_path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+            os.replace(tmp_path, out_path)
+        print("{} -> {} ({} objects)".format(file_path, out_path,
+                                             len(objs_json)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert .db_<Class> snapshots between JSON and binary")
+    parser.add_argument("direction", choices=("to-binary", "to-json"))
+    parser.add_argument("paths", nargs="+", help="snapshot files to convert")
+    args = parser.parse_args()
+    _convert(args.paths, args.direction == "to-binary")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+""" SQLite storage module
+
+A storage backend keeps the objects of a model class out of process
+memory. Base delegates to it when `Base.storage` (or a subclass'
+`storage`) is set, through these methods:
+
+    load(cls), save(obj), save_many(objs), remove(cls, id), get(cls, id),
+    search(cls, attributes, limit, where), iter(cls, attributes, where),
+    count(cls), page(cls, limit, after)
+
+When the table of a class is created, the objects of its .db_<Class>.json
+(or .bin) snapshot and journal, if any, are imported into it.
+"""
+from contextlib import contextmanager
+from itertools import islice
+from os import path
+from typing import Callable, Iterable, Iterator, List, Tuple, TypeVar
+import json
+import sqlite3
+import threading
+from models import query
+
+
+# SQL form of the query operators applied to scalar operands
+SQL_OPERATORS = {"eq": "=", "ne": "IS NOT", "lt": "<", "lte": "<=",
+                 "gt": ">", "gte": ">="}
+SCALARS = (str, int, float, bytes)
+
+
+class SQLiteStorage():
+    """ Store each model class in a SQLite table
+
+    Rows hold the serialized object plus one indexed column per attribute
+    of `indexed_attributes`, so searches on those attributes run as index
+    lookups. The database uses WAL mode, letting several processes read
+    while one writes. Threads borrow connections from a pool that keeps
+    up to `pool_size` idle ones, so a server starting a thread per request
+    does not open a connection per request; statements are built once per
+    class and reused, hitting the connection's prepared statement cache.
+    """
+
+    def __init__(self, db_path: str = ".db.sqlite3", pool_size: int = 4):
+        """ Initialize a SQLiteStorage on the database file db_path
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """ Borrow an idle connection, or open one, for the duration of the
+        block; it goes back to the pool unless the pool is full
+        """
+        with self._idle_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._idle_lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def _table(self, cls: type) -> dict:
+        """ Statements for the table of a model class, creating the table
+        and its indexes on first use, filled from the class' files
+        """
+        s_class = cls.__name__
+        table = self._tables.get(s_class)
+        if table is not None:
+            return table
+
+        columns = tuple(cls.indexed_attributes)
+        name = '"{}"'.format(s_class)
+        table = {
+            "columns": columns,
+            "upsert": "INSERT OR REPLACE INTO {} (id{}, data) "
+                      "VALUES (?{}, ?)".format(
+                          name,
+                          "".join(', "{}"'.format(c) for c in columns),
+                          ", ?" * len(columns)),
+            "delete": "DELETE FROM {} WHERE id = ?".format(name),
+            "get": "SELECT data FROM {} WHERE id = ?".format(name),
+            "count": "SELECT COUNT(*) FROM {}".format(name),
+            "select": "SELECT data FROM {}".format(name),
+            "page": "SELECT id, data FROM {} WHERE id > ? "
+                    "ORDER BY id LIMIT ?".format(name),
+        }
+        with self._connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = ?", (s_class,)).fetchone() is None
+            conn.execute("CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY"
+                         "{}, data TEXT NOT NULL)".format(
+                             name, "".join(', "{}"'.format(column)
+                                           for column in columns)))
+            for column in columns:
+                conn.execute('CREATE INDEX IF NOT EXISTS "ix_{0}_{1}" '
+                             'ON {2} ("{1}")'.format(s_class, column, name))
+            if created:
+                conn.executemany(table["upsert"],
+                                 [self._row(table, cls(**obj_json))
+                                  for obj_json in self._files(cls)])
+        with self._tables_lock:
+            self._tables[s_class] = table
+        return table
+
+    @staticmethod
+    def _files(cls: type) -> Iterator[dict]:
+        """ Serialized objects of the .db_<Class> snapshot and journal files
+        the class used before this storage
+        """
+        objs_json = dict(cls._read_snapshot())
+        journal_path = ".db_{}.journal".format(cls.__name__)
+        if path.exists(journal_path):
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("op") == "save":
+                        objs_json[record["obj"]["id"]] = record["obj"]
+                    elif record.get("op") == "remove":
+                        objs_json.pop(record["id"], None)
+        return iter(objs_json.values())
+
+    def _row(self, table: dict, obj: TypeVar('Base')) -> tuple:
+        """ Parameters of the upsert statement for an object
+        """
+        return ((obj.id,)
+                + tuple(getattr(obj, c, None) for c in table["columns"])
+                + (json.dumps(obj.to_json(True)),))
+
+    def load(self, cls: type):
+        """ Make sure the table of a model class exists
+        """
+        self._table(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace one object
+        """
+        self.save_many([obj])
+
+    def save_many(self, objs: Iterable[TypeVar('Base')]):
+        """ Insert or replace objects of one class in a single transaction
+        """
+        objs = list(objs)
+        if not objs:
+            return
+        table = self._table(type(objs[0]))
+        with self._connection() as conn, conn:
+            conn.executemany(table["upsert"],
+                             [self._row(table, obj) for obj in objs])
+
+    def remove(self, cls: type, obj_id: str):
+        """ Delete one object by ID
+        """
+        table = self._table(cls)
+        with self._connection() as conn, conn:
+            conn.execute(table["delete"], (obj_id,))
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        table = self._table(cls)
+        with self._connection() as conn:
+            row = conn.execute(table["get"], (obj_id,)).fetchone()
+        return None if row is None else cls(**json.loads(row[0]))
+
+    def count(self, cls: type) -> int:
+        """ Count the objects of a class
+        """
+        table = self._table(cls)
+        with self._connection() as conn:
+            return conn.execute(table["count"]).fetchone()[0]
+
+    def search(self, cls: type, attributes: dict = {}, limit: int = None,
+               where: Callable = None) -> List[TypeVar('Base')]:
+        """ Objects with matching attributes, at most `limit` of them
+        """
+        objs = self._select(cls, attributes, where, limit)
+        try:
+            return list(islice(objs, limit))
+        finally:
+            objs.close()
+
+    def iter(self, cls: type, attributes: dict = {},
+             where: Callable = None) -> Iterator[TypeVar('Base')]:
+        """ Lazily yield objects with matching attributes
+        """
+        return self._select(cls, attributes, where)
+
+    def _select(self, cls: type, attributes: dict, where: Callable = None,
+                limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield objects with matching attributes: conditions on indexed
+        attributes with scalar operands are evaluated in SQL, the others
+        and `where` in Python as rows are fetched
+        """
+        table = self._table(cls)
+        clauses, params, rest = [], [], []
+        for name, op, value in query.parse(attributes):
+            if name not in table["columns"]:
+                rest.append((name, op, value))
+            elif op == "eq" and value is None:
+                clauses.append('"{}" IS NULL'.format(name))
+            elif op in SQL_OPERATORS and type(value) in SCALARS:
+                clauses.append('"{}" {} ?'.format(name, SQL_OPERATORS[op]))
+                params.append(value)
+            elif (op == "in" and type(value) in query.COLLECTIONS
+                    and all(type(v) in SCALARS for v in value)):
+                value = list(value)
+                clauses.append('"{}" IN ({})'.format(
+                    name, ", ".join("?" * len(value))))
+                params.extend(value)
+            else:
+                rest.append((name, op, value))
+        sql = table["select"]
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if limit is not None and not rest and where is None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._connection() as conn:
+            for data, in conn.execute(sql, params):
+                obj = cls(**json.loads(data))
+                if query.matches(obj, rest, where):
+                    yield obj
+
+    def page(self, cls: type, limit: int = None,
+             after: str = None) -> Tuple[List[TypeVar('Base')], str]:
+        """ Up to `limit` objects ordered by ID after the ID `after`, and
+        the cursor of the next page (None on the last one)
+        """
+        table = self._table(cls)
+        with self._connection() as conn:
+            rows = conn.execute(
+                table["page"], ("" if after is None else after,
+                                -1 if limit is None else limit + 1)).fetchall()
+        next_after = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_after = rows[-1][0]
+        return [cls(**json.loads(data)) for _, data in rows], next_after
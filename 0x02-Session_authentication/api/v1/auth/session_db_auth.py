@@ -51,11 +51,10 @@ class SessionDBAuth(SessionExpAuth):
             return None
 
         try:
-            user_sessions = UserSession.search({'session_id': session_id})
-            if not user_sessions:
+            user_session = UserSession.first({'session_id': session_id})
+            if user_session is None:
                 return None
 
-            user_session = user_sessions[0]
             # Calculate the expiration time
             session_start = user_session.created_at
             session_end = session_start + timedelta(
@@ -84,8 +83,8 @@ class SessionDBAuth(SessionExpAuth):
         session_id = self.session_cookie(request)
         if not session_id:
             return False
-        user_session = UserSession.search({"session_id": session_id})
-        if user_session:
-            user_session[0].remove()
+        user_session = UserSession.first({"session_id": session_id})
+        if user_session is not None:
+            user_session.remove()
             return True
         return False
@@ -27,11 +27,10 @@ def login():
     if not password:
         return jsonify({"error": "password missing"}), 400
 
-    users = User.search({'email': email})
-    if not users:
+    user = User.first({'email': email})
+    if user is None:
         return jsonify({"error": "no user found for this email"}), 404
 
-    user = users[0]
     if not user.is_valid_password(password):
         return jsonify({"error": "wrong password"}), 401
 
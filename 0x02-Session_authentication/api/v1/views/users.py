@@ -2,18 +2,73 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
-from models.user import User
+from flask import Response, abort, jsonify, request
+from models.base import to_json_array
+from models.user import User, create_users
+import json
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: maximum number of users to return, ordered by ID
+      - after: ID of the last user of the previous page
+      - stream: `json` or `ndjson` to serialize users incrementally
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, or one page of them
+        with the `after` value of the next page in the X-Next-After header
+      - 400 if limit is not a positive integer or stream is unknown
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    stream = request.args.get('stream')
+    if limit is None and after is None and stream is None:
+        return _json_response(to_json_array(User.all()))
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': "stream must be json or ndjson"}), 400
+
+    users, next_after = User.page(limit, after)
+    if stream is None:
+        response = _json_response(to_json_array(users))
+    elif stream == 'ndjson':
+        response = Response(_ndjson_lines(users),
+                            mimetype='application/x-ndjson')
+    else:
+        response = Response(_json_array(users), mimetype='application/json')
+    if next_after is not None:
+        response.headers['X-Next-After'] = next_after
+    return response
+
+
+def _json_array(users: list):
+    """ Yield a JSON array of users one element at a time
+    """
+    yield '['
+    for i, user in enumerate(users):
+        yield (',' if i else '') + user.to_json_string(cache=False)
+    yield ']\n'
+
+
+def _ndjson_lines(users: list):
+    """ Yield one JSON line per user
+    """
+    for user in users:
+        yield user.to_json_string(cache=False) + '\n'
+
+
+def _json_response(text: str, status: int = 200) -> Response:
+    """ Response of an already serialized JSON document
+    """
+    return Response(text + '\n', status=status, mimetype='application/json')
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -27,12 +82,12 @@ def view_one_user(user_id: str = None) -> str:
     if user_id == "me":
         if request.current_user is None:
             abort(404)
-        return jsonify(request.current_user.to_json())
+        return _json_response(request.current_user.to_json_string())
 
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return _json_response(user.to_json_string())
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -85,12 +140,46 @@ def create_user() -> str:
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
             user.save()
-            return jsonify(user.to_json()), 201
+            return _json_response(user.to_json_string(), 201)
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
 
 
+@app_views.route('/users/import', methods=['POST'], strict_slashes=False)
+def import_users() -> str:
+    """ POST /api/v1/users/import
+    Body: a JSON array of users, or one JSON user per line with the
+    `application/x-ndjson` content type; each user has the JSON
+    parameters of POST /api/v1/users
+    Return:
+      - created/rejected counts and one result per row: {"id": <ID>} for
+        a created User, {"error": <message>} for a rejected row
+      - 400 if the body is malformed or no User was created
+    """
+    if request.mimetype == 'application/x-ndjson':
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'error': "Wrong format"}), 400
+    try:
+        results = create_users(rows)
+    except Exception as e:
+        return jsonify({'error': "Can't create Users: {}".format(e)}), 400
+    created = sum(1 for result in results if "id" in result)
+    return jsonify({"created": created,
+                    "rejected": len(results) - created,
+                    "results": results}), 201 if created else 400
+
+
 @app_views.route('/users/<user_id>', methods=['PUT'], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """ PUT /api/v1/users/:id
@@ -121,4 +210,4 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return _json_response(user.to_json_string())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+""" Memory report: bytes per User / UserSession object, compared with the
+same attributes stored in a per-instance __dict__
+
+Usage:
+    ./bench_models_memory.py [--count N]
+"""
+import argparse
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Callable, List
+from models.user import User
+from models.user_session import UserSession
+
+
+class DictUser():
+    """ User as stored before __slots__: attributes in a __dict__
+    """
+
+    def __init__(self, **kwargs):
+        """ Same attributes as User """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+
+class DictUserSession():
+    """ UserSession as stored before __slots__: attributes in a __dict__
+    """
+
+    def __init__(self, **kwargs):
+        """ Same attributes as UserSession """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = kwargs.get('user_id')
+        self.session_id = kwargs.get('session_id')
+
+
+def user_kwargs(i: int) -> dict:
+    """ Attributes of the i-th synthetic user """
+    return {"email": "user{}@example.com".format(i),
+            "_password": "{:064x}".format(i),
+            "first_name": "First{}".format(i),
+            "last_name": "Last{}".format(i)}
+
+
+def session_kwargs(i: int) -> dict:
+    """ Attributes of the i-th synthetic session """
+    return {"user_id": str(uuid.UUID(int=i)),
+            "session_id": str(uuid.UUID(int=i + 1))}
+
+
+def bytes_per_object(factory: Callable, make_kwargs: Callable,
+                     count: int) -> float:
+    """ Average traced bytes of one object, excluding its kwargs """
+    all_kwargs = [make_kwargs(i) for i in range(count)]
+    tracemalloc.start()
+    objs = [factory(**kwargs) for kwargs in all_kwargs]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return size / count
+
+
+def main(argv: List[str] = None):
+    """ Print the bytes/object table """
+    parser = argparse.ArgumentParser(description="Model memory report")
+    parser.add_argument("--count", type=int, default=100000,
+                        help="objects per measurement (default: 100000)")
+    args = parser.parse_args(argv)
+
+    rows = [("User", DictUser, User, user_kwargs),
+            ("UserSession", DictUserSession, UserSession, session_kwargs)]
+    print("{:<12} {:>14} {:>14} {:>8}".format(
+        "model", "before B/obj", "after B/obj", "saved"))
+    for name, before_cls, after_cls, make_kwargs in rows:
+        before = bytes_per_object(before_cls, make_kwargs, args.count)
+        after = bytes_per_object(after_cls, make_kwargs, args.count)
+        print("{:<12} {:>14.0f} {:>14.0f} {:>7.0%}".format(
+            name, before, after, 1 - after / before))
+
+
+if __name__ == "__main__":
+    main()
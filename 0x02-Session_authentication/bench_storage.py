@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+""" Benchmark of the JSON file store against the SQLite storage backend
+
+Usage:
+    ./bench_storage.py [--sizes 10000 100000 1000000] [--lookups N]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+from models import base
+from models.base import Base, DATA
+from models.sqlite_storage import SQLiteStorage
+from models.user import User
+
+
+def make_users(count: int) -> List[User]:
+    """ Build `count` users with distinct emails """
+    users = []
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First{}".format(i),
+                    last_name="Last{}".format(i))
+        user.password = "pwd{}".format(i)
+        users.append(user)
+    return users
+
+
+def timed(func: Callable, repeat: int = 1) -> float:
+    """ Average seconds of `repeat` calls """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def bench_backend(backend: str, users: List[User], lookups: int) -> dict:
+    """ Time the common operations on one backend, in a fresh directory
+
+    Return:
+      - operation name -> seconds per operation
+    """
+    rng = random.Random(0)
+    ids = [rng.choice(users).id for _ in range(lookups)]
+    emails = [rng.choice(users).email for _ in range(lookups)]
+    results = {}
+
+    if backend == "sqlite":
+        Base.storage = SQLiteStorage("bench.sqlite3")
+        results["populate"] = timed(lambda: Base.storage.save_many(users))
+        Base.storage = SQLiteStorage("bench.sqlite3")
+    else:
+        Base.storage = None
+
+        def populate():
+            DATA["User"] = {user.id: user for user in users}
+            User.save_to_file()
+        results["populate"] = timed(populate)
+        DATA["User"] = {}
+
+    results["load"] = timed(User.load_from_file)
+    results["count"] = timed(User.count)
+    results["get"] = timed(lambda: [User.get(i) for i in ids]) / lookups
+    results["search_email"] = timed(
+        lambda: [User.search({"email": e}) for e in emails]) / lookups
+    results["page_100"] = timed(lambda: User.page(100, ids[0]), 10)
+
+    extra = User(email="extra@example.com")
+    results["save_one"] = timed(extra.save)
+    results["remove_one"] = timed(extra.remove)
+    return results
+
+
+def main(argv: List[str] = None):
+    """ Run the benchmark for every size and print a table """
+    parser = argparse.ArgumentParser(description="JSON vs SQLite storage")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000],
+                        help="numbers of users (default: 10000 100000)")
+    parser.add_argument("--lookups", type=int, default=1000,
+                        help="get/search calls per measurement")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_storage_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        print("{:>9} {:<7} {:>10} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}"
+              .format("users", "backend", "populate", "load", "get us",
+                      "search us", "page ms", "save ms", "remove ms"))
+        for size in args.sizes:
+            users = make_users(size)
+            for backend in ("json", "sqlite"):
+                r = bench_backend(backend, users, args.lookups)
+                print("{:>9} {:<7} {:>9.2f}s {:>8.2f}s {:>9.1f} {:>9.1f} "
+                      "{:>9.2f} {:>9.2f} {:>9.2f}".format(
+                          size, backend, r["populate"], r["load"],
+                          r["get"] * 1e6, r["search_email"] * 1e6,
+                          r["page_100"] * 1e3, r["save_one"] * 1e3,
+                          r["remove_one"] * 1e3))
+            DATA.clear()
+            base.SORTED_IDS.clear()
+    finally:
+        Base.storage = None
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+""" Bulk import of users into the .db_User store
+
+Usage:
+    ./import_users.py users.json      JSON array of users
+    ./import_users.py users.ndjson    one JSON user per line
+    ./import_users.py - < users.ndjson
+
+Each user has the JSON parameters of POST /api/v1/users. Rejected rows are
+reported on stderr with their line (NDJSON) or position (JSON array), and
+the exit status is 1 if any row was rejected.
+"""
+import argparse
+import json
+import sys
+from typing import List, Tuple
+from models.user import User, create_users
+
+
+def parse_rows(text: str) -> List[Tuple[str, object]]:
+    """ (position, row) pairs of a JSON array or NDJSON document; NDJSON
+    lines that are not valid JSON become None rows, rejected as malformed
+    """
+    if text.lstrip().startswith('['):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("Not a JSON array")
+        return [("row {}".format(i), row) for i, row in enumerate(rows)]
+    numbered = []
+    for i, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        numbered.append(("line {}".format(i), row))
+    return numbered
+
+
+def main(argv: List[str] = None) -> int:
+    """ Import the users of a file and print a summary """
+    parser = argparse.ArgumentParser(description="Bulk import of users")
+    parser.add_argument("path", help="JSON array or NDJSON file, - for stdin")
+    args = parser.parse_args(argv)
+
+    if args.path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.path) as f:
+            text = f.read()
+    numbered = parse_rows(text)
+
+    User.load_from_file()
+    results = create_users(row for _, row in numbered)
+    rejected = 0
+    for (position, _), result in zip(numbered, results):
+        if "error" in result:
+            rejected += 1
+            print("{}: {}".format(position, result["error"]),
+                  file=sys.stderr)
+    print("{} users created, {} rejected".format(len(results) - rejected,
+                                                 rejected))
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+""" Reader-writer lock module
+"""
+from contextlib import contextmanager
+import threading
+
+
+class ReadWriteLock():
+    """ Lock letting many threads read at once, or one thread write
+
+    Waiting writers block new readers so a steady stream of reads cannot
+    starve writes. Both sides are reentrant, and the writing thread may
+    also read; a reading thread cannot upgrade to writing.
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked ReadWriteLock
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        """ Block until no other thread writes or waits to write
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+                self._readers += 1
+            self._local.counted = True
+        self._local.depth = depth + 1
+
+    def release_read(self):
+        """ Release one level of read access
+        """
+        self._local.depth -= 1
+        if self._local.depth == 0 and getattr(self._local, "counted", False):
+            self._local.counted = False
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        """ Block until no other thread reads or writes
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "depth", 0):
+                raise RuntimeError("Cannot upgrade a read lock to write")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """ Release one level of write access
+        """
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """ Context manager holding read access
+        """
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """ Context manager holding write access
+        """
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
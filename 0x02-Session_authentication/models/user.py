@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """ User module
 """
+from typing import Iterable, List
 import hashlib
 from models.base import Base
 
@@ -8,6 +9,8 @@ from models.base import Base
 class User(Base):
     """ User class
     """
+    indexed_attributes = ("email",)
+    __slots__ = ("email", "_password", "first_name", "last_name")
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
@@ -57,3 +60,30 @@ class User(Base):
             return "{}".format(self.last_name)
         else:
             return "{} {}".format(self.first_name, self.last_name)
+
+
+def create_users(rows: Iterable[dict]) -> List[dict]:
+    """ Create one User per row, with the fields of POST /api/v1/users
+    (email, password, first_name, last_name), and save them all at once
+    Return:
+      - one result per row: {"id": <new user ID>} or {"error": <message>}
+    """
+    results = []
+    users = []
+    for row in rows:
+        if not isinstance(row, dict):
+            results.append({"error": "Wrong format"})
+        elif row.get("email", "") == "":
+            results.append({"error": "email missing"})
+        elif row.get("password", "") == "":
+            results.append({"error": "password missing"})
+        else:
+            user = User()
+            user.email = row.get("email")
+            user.password = row.get("password")
+            user.first_name = row.get("first_name")
+            user.last_name = row.get("last_name")
+            users.append(user)
+            results.append({"id": user.id})
+    User.save_many(users)
+    return results
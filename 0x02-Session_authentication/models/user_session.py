@@ -9,6 +9,8 @@ class UserSession(Base):
     """
     UserSession class for storing session IDs linked to user IDs.
     """
+    indexed_attributes = ("session_id", "user_id")
+    __slots__ = ("user_id", "session_id")
 
     def __init__(self, *args: list, **kwargs: dict):
         """
@@ -3,13 +3,95 @@
 Authentication module for handling password security.
 """
 
+import os
+import threading
+import time
 import uuid
 import bcrypt
+from functools import lru_cache
 from db import DB
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.orm.exc import NoResultFound
 from user import User
 
+# Hashing time budget used to pick the bcrypt cost factor, in milliseconds
+TARGET_HASH_MS = 250
+
+# Cost factor bounds; calibration never goes below MIN_ROUNDS
+MIN_ROUNDS = 10
+MAX_ROUNDS = 31
+
+# Serializes calibration: concurrent sweeps would slow each other down
+_calibration_lock = threading.Lock()
+
+
+def _bcrypt_rounds(target_ms: float = TARGET_HASH_MS) -> int:
+    """
+    Picks the largest bcrypt cost factor whose hash time on this machine
+    fits in the target budget. The result is cached for the process, and
+    the BCRYPT_ROUNDS environment variable pins it without measuring.
+    Calibration runs once even when several threads ask at the same time.
+
+    Args:
+        target_ms (float): Time budget for hashing one password.
+
+    Returns:
+        int: The cost factor to pass to bcrypt.gensalt().
+    """
+    with _calibration_lock:
+        return _calibrate_rounds(target_ms)
+
+
+@lru_cache(maxsize=None)
+def _calibrate_rounds(target_ms: float) -> int:
+    """
+    Measures the cost factor for _bcrypt_rounds.
+
+    Args:
+        target_ms (float): Time budget for hashing one password.
+
+    Returns:
+        int: The cost factor to pass to bcrypt.gensalt().
+    """
+    pinned = os.getenv("BCRYPT_ROUNDS")
+    if pinned:
+        return min(max(int(pinned), 4), MAX_ROUNDS)
+
+    rounds = MIN_ROUNDS
+    elapsed = _hash_time_ms(rounds)
+    # Each extra round doubles the work
+    while rounds < MAX_ROUNDS and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed = _hash_time_ms(rounds)
+    if elapsed > target_ms and rounds > MIN_ROUNDS:
+        rounds -= 1
+    return rounds
+
+
+def _hash_time_ms(rounds: int) -> float:
+    """
+    Measures the time, in milliseconds, of one bcrypt hash at a cost.
+    """
+    salt = bcrypt.gensalt(rounds=rounds)
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", salt)
+    return (time.perf_counter() - started) * 1000
+
+
+def _needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Tells whether a stored hash uses a lower cost than the calibrated one.
+
+    Args:
+        hashed_password (bytes): A bcrypt hash such as b"$2b$12$...".
+
+    Returns:
+        bool: True if the hash should be upgraded on the next login.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    return int(hashed_password.split(b"$")[2]) < _bcrypt_rounds()
+
 
 def _hash_password(password: str) -> bytes:
     """
@@ -21,7 +103,8 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: The salted and hashed password as a byte string.
     """
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode("utf-8"),
+                         bcrypt.gensalt(rounds=_bcrypt_rounds()))
 
 
 def _generate_uuid() -> str:
@@ -39,6 +122,8 @@ class Auth:
 
     def __init__(self):
         self._db = DB()
+        # Calibrate up front rather than on the first register/login
+        _bcrypt_rounds()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -67,7 +152,8 @@ class Auth:
 
     def valid_login(self, email: str, password: str) -> bool:
         """
-        Validates user login attempt.
+        Validates user login attempt. A password hashed with an outdated
+        cost factor is re-hashed at the calibrated cost once it is verified.
 
         Args:
             email (str): The email of the user trying to log in.
@@ -79,6 +165,9 @@ class Auth:
         try:
             user = self._db.find_user_by(email=email)
             if bcrypt.checkpw(password.encode("utf-8"), user.hashed_password):
+                if _needs_rehash(user.hashed_password):
+                    self._db.update_user(
+                        user.id, hashed_password=_hash_password(password))
                 return True
         except NoResultFound:
             return False